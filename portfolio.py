@@ -0,0 +1,201 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+Portfolio solving
+=================
+
+Different solving approaches win on different boards : plain propagation
+of the exclusion rules is fastest on easy boards, while search wins on
+hard ones. `solve_portfolio` races several strategies on the same puzzle,
+each one in its own worker process, and returns the first verified
+solution, terminating the other workers.
+
+A strategy is a function taking a puzzle as a 81 characters string
+('.' for unsolved cells) and returning the solution as a 81 characters
+string, or None when it can't solve the puzzle.
+"""
+
+from __future__ import division, print_function
+import multiprocessing
+from multiprocessing.connection import wait
+import time
+
+from sudoku_handler import Sudoku, SolveTimeout
+
+
+def propagate(puzzle):
+    """apply the Sudoku exclusion rules until there is no more progress"""
+    S = Sudoku.from_string(puzzle)
+    try:
+        S.propagate()
+    except ValueError:
+        return None
+    return S.to_string() if S.verify() else None
+
+
+def search(puzzle):
+    """exclusion rules, completed by depth-first search (see Sudoku.search)"""
+    S = Sudoku.from_string(puzzle).search()
+    return None if S is None else S.to_string()
+
+
+# indices of the 20 peers (same row, column or block) of each cell :
+_PEERS = [sorted(set(j for j in range(81)
+                     if j != i and (j // 9 == i // 9 or j % 9 == i % 9 or
+                                    (j // 27 == i // 27 and
+                                     j % 9 // 3 == i % 9 // 3))))
+          for i in range(81)]
+
+
+def backtrack(puzzle, deadline=None):
+    """plain backtracking on the cell values, always filling the cell
+    with the fewest candidates first. No Cell objects are involved,
+    which makes it the cheapest strategy per explored node.
+
+    deadline : [optional] time.time() value after which SolveTimeout
+               is raised (checked at each node)
+    """
+    grid = [0 if ch == '.' else int(ch) for ch in puzzle.replace('0', '.')]
+    for i, v in enumerate(grid):
+        if v and any(grid[j] == v for j in _PEERS[i]):
+            return None
+
+    def fill():
+        if deadline is not None and time.time() > deadline:
+            raise SolveTimeout('Deadline reached during backtracking')
+        best, best_cand = None, None
+        for i in range(81):
+            if grid[i]:
+                continue
+            cand = set(range(1, 10)).difference(grid[j] for j in _PEERS[i])
+            if best is None or len(cand) < len(best_cand):
+                best, best_cand = i, cand
+                if len(cand) <= 1:
+                    break
+        if best is None:
+            return True
+        for v in best_cand:
+            grid[best] = v
+            if fill():
+                return True
+        grid[best] = 0
+        return False
+
+    if not fill():
+        return None
+    return ''.join(str(v) for v in grid)
+
+
+# available strategies, by name (default portfolio):
+STRATEGIES = {
+    'propagate': propagate,
+    'search': search,
+    'backtrack': backtrack,
+}
+
+
+def is_solution(puzzle, solution):
+    """check that `solution` is a correct solution of `puzzle`
+    (both as 81 characters strings)"""
+    if solution is None or len(solution) != 81:
+        return False
+    puzzle = puzzle.replace('0', '.')
+    if any(p != '.' and p != s for p, s in zip(puzzle, solution)):
+        return False
+    try:
+        return Sudoku.from_string(solution).verify()
+    except ValueError:
+        return False
+
+
+def _worker(strategy, puzzle, conn):
+    """run `strategy` on `puzzle` and send the solution through `conn`"""
+    try:
+        solution = strategy(puzzle)
+    except Exception:
+        solution = None
+    conn.send(solution)
+    conn.close()
+
+
+def solve_portfolio(puzzle, strategies=None, timeout=None):
+    """race several solving strategies on `puzzle`, in parallel processes
+
+    puzzle : 81 characters string ('.' or '0' for unsolved cells),
+             or Sudoku object
+    strategies : names of the strategies to race (see STRATEGIES),
+                 by default all of them
+    timeout : [optional] maximum waiting time, in seconds
+
+    Returns (solution, name) with
+     * solution : the first verified solution (81 characters string),
+                  or None if no strategy found one in time
+     * name : name of the winning strategy (None if no solution)
+    """
+    if not isinstance(puzzle, Sudoku):
+        # validate and normalize the puzzle string
+        puzzle = Sudoku.from_string(puzzle)
+    puzzle = puzzle.to_string()
+    if strategies is None:
+        strategies = sorted(STRATEGIES)
+    # one pipe per worker : the parent keeps only the reading end, so
+    # that a worker dying without answer is seen as EOF on its pipe
+    workers = []
+    readers = []
+    pending = {}  # reading end -> strategy name
+    try:
+        for name in strategies:
+            reader, writer = multiprocessing.Pipe(duplex=False)
+            w = multiprocessing.Process(target=_worker,
+                                        args=(STRATEGIES[name], puzzle,
+                                              writer))
+            w.daemon = True
+            w.start()
+            writer.close()
+            workers.append(w)
+            readers.append(reader)
+            pending[reader] = name
+
+        deadline = None if timeout is None else time.time() + timeout
+        winner = (None, None)
+        while pending and winner[0] is None:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0., deadline - time.time())
+            ready = wait(list(pending), timeout=remaining)
+            if not ready:
+                # time is over
+                break
+            for reader in ready:
+                name = pending.pop(reader)
+                try:
+                    solution = reader.recv()
+                except EOFError:
+                    # the worker died without answer : it lost
+                    continue
+                if is_solution(puzzle, solution):
+                    winner = (solution, name)
+                    break
+    finally:
+        # Cancel the remaining workers:
+        for w in workers:
+            if w.is_alive():
+                w.terminate()
+        for w in workers:
+            w.join()
+        for reader in readers:
+            reader.close()
+    return winner
+
+
+if __name__ == '__main__':
+    import sys
+    sudoku_file = sys.argv[1] if len(sys.argv) > 1 else 'unsolved.txt'
+    S = Sudoku(sudoku_file)
+    t0 = time.time()
+    solution, name = solve_portfolio(S)
+    if solution is None:
+        print('Unable to solve the Sudoku :-(')
+    else:
+        print('Sudoku solved by "%s" in %.3f s\n' % (name, time.time() - t0))
+        print(Sudoku.from_string(solution, name=S.sudoku_file))
@@ -0,0 +1,220 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+Puzzle datasets
+===============
+
+Memory-mapped, read-only access to large collections of Sudoku puzzles.
+
+Two fixed-width file formats are supported :
+ * text   : one puzzle per line, 81 characters ('1'-'9', '.' or '0' for
+            unsolved cells) followed by the line ending. All lines must
+            have the same length.
+ * binary : 81 bytes per puzzle, one byte per cell holding the value
+            1-9, or 0 for an unsolved cell. No separator.
+
+Puzzles are never read as a whole : indexing a dataset returns a
+memoryview on the mapped file, and slicing it returns a new dataset
+sharing the same mapping.
+"""
+
+from __future__ import division, print_function
+import mmap
+import os.path
+
+from sudoku_handler import Sudoku, CELL_VALUE, INVALID_CELL
+
+# number of cells in a puzzle (= bytes of a binary record)
+PUZZLE_SIZE = 81
+
+# cell value (see sudoku_handler.CELL_VALUE) -> ascii character
+_TO_ASCII = bytes(bytearray(b'.123456789') + bytearray(256 - 10))
+
+
+class PuzzleDataset(object):
+    """indexed, memory-mapped collection of fixed-width Sudoku puzzles
+
+    >>> with PuzzleDataset('unsolved_list.txt') as ds:
+    ...     S = ds.get_sudoku(0)
+    ...     for puzzle in ds[:10]:
+    ...         pass  # `puzzle` is a memoryview of 81 bytes
+    """
+
+    def __init__(self, filename, binary=False):
+        """filename : puzzle file to map
+        binary : True for the fixed-width binary format,
+                 False for the one puzzle per line text format
+        """
+        self.filename = filename
+        self.binary = binary
+        # slices of the dataset don't own the mapping (see _view) :
+        self._is_view = False
+        with open(filename, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                self._mmap = None
+                self._buffer = memoryview(b'')
+            else:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._buffer = memoryview(self._mmap)
+
+        if binary:
+            self.record_size = PUZZLE_SIZE
+            nb_puzzles, extra = divmod(size, self.record_size)
+        else:
+            # the record size is given by the first line ending
+            end = self._mmap.find(b'\n') if size else -1
+            if end < 0:
+                # single line, without line ending
+                self.record_size = size
+                nb_puzzles, extra = (1, 0) if size else (0, 0)
+                valid = size in (0, PUZZLE_SIZE)
+            else:
+                self.record_size = end + 1
+                # line ending : '\n' or '\r\n'
+                ending = self.record_size - PUZZLE_SIZE
+                valid = ending == 1 or \
+                        (ending == 2 and self._buffer[PUZZLE_SIZE] == ord('\r'))
+                # the last line may lack its line ending
+                nb_puzzles, extra = divmod(size + ending, self.record_size)
+                if extra == ending:
+                    nb_puzzles, extra = divmod(size, self.record_size)
+            if not valid:
+                self.close()
+                raise ValueError('Dataset "%s" is not made of %d characters '
+                                 'lines (first line has %d characters)' %
+                                 (os.path.basename(filename), PUZZLE_SIZE,
+                                  end if end >= 0 else size))
+        if extra:
+            self.close()
+            raise ValueError('Dataset "%s" is of wrong size '
+                             '(%d bytes is not a multiple of %d)' %
+                             (os.path.basename(filename), size,
+                              self.record_size))
+        self._indices = range(nb_puzzles)
+
+    # end __init__
+
+    def _view(self, indices):
+        """new dataset restricted to `indices`, sharing the mapping"""
+        ds = object.__new__(type(self))
+        ds.__dict__.update(self.__dict__)
+        ds._indices = indices
+        ds._is_view = True
+        return ds
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, i):
+        """puzzle number `i` as a memoryview of 81 bytes, in the format
+        of the file (see PuzzleDataset.get_string for a decoded version).
+        Slicing returns a PuzzleDataset sharing the same mapping.
+        """
+        if isinstance(i, slice):
+            return self._view(self._indices[i])
+        return self._record(self._indices[i])
+
+    def __iter__(self):
+        for i in self._indices:
+            yield self._record(i)
+
+    def _record(self, n):
+        """memoryview of the puzzle at position `n` in the file.
+        In the text format, ValueError is raised if the line doesn't end
+        right after the 81 cells (lines of different lengths)"""
+        start = n * self.record_size
+        end = start + PUZZLE_SIZE
+        buf = self._buffer
+        if not self.binary and end < len(buf):
+            # the line ending must follow ('\n' or '\r\n')
+            ending = buf[end:start + self.record_size].tobytes()
+            if ending not in (b'\n', b'\r\n'):
+                raise ValueError('Dataset "%s" line %d is not made of %d '
+                                 'characters' % (os.path.basename(
+                                     self.filename), n + 1, PUZZLE_SIZE))
+        return buf[start:end]
+
+    def get_string(self, i):
+        """puzzle number `i` as a 81 characters string
+        ('.' for unsolved cells), whatever the file format.
+        ValueError is raised on invalid cells"""
+        values = self[i].tobytes().translate(CELL_VALUE)
+        if INVALID_CELL in values:
+            j = values.index(INVALID_CELL)
+            raise ValueError('Dataset "%s" puzzle %d contains invalid cell '
+                             '%r at position %d' %
+                             (os.path.basename(self.filename),
+                              self._indices[i], self[i][j:j + 1].tobytes(),
+                              j))
+        return values.translate(_TO_ASCII).decode('ascii')
+
+    def get_sudoku(self, i):
+        """puzzle number `i` as a Sudoku object"""
+        name = '%s[%d]' % (os.path.basename(self.filename), self._indices[i])
+        return Sudoku.from_string(self.get_string(i), name=name)
+
+    def close(self):
+        """release the memory mapping. Views of the dataset must not be
+        used anymore. If memoryviews returned by the dataset are still
+        alive, the file is unmapped once they are garbage collected.
+        Does nothing on a view (slice) : only the dataset opened from
+        the file owns the mapping."""
+        if self._is_view:
+            return
+        self._buffer.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # exported memoryviews : leave the unmapping to the
+                # garbage collector
+                pass
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return 'PuzzleDataset(%r, binary=%r) [%d puzzles]' % \
+               (self.filename, self.binary, len(self))
+
+
+def write_binary(puzzles, filename):
+    """write the iterable `puzzles` in the fixed-width binary format
+
+    puzzles : 81 characters strings, bytes or memoryviews
+              (e.g. a text PuzzleDataset, for conversion)
+    Returns the number of written puzzles
+    """
+    nb_puzzles = 0
+    with open(filename, 'wb') as f:
+        for puzzle in puzzles:
+            if isinstance(puzzle, str):
+                puzzle = puzzle.encode('ascii')
+            record = bytes(puzzle).translate(CELL_VALUE)
+            if len(record) != PUZZLE_SIZE:
+                raise ValueError('Puzzle %d is of wrong size '
+                                 '(%d instead of %d cells)' %
+                                 (nb_puzzles, len(record), PUZZLE_SIZE))
+            if INVALID_CELL in record:
+                i = record.index(INVALID_CELL)
+                raise ValueError('Puzzle %d contains invalid cell %r '
+                                 'at position %d' %
+                                 (nb_puzzles, bytes(puzzle[i:i + 1]), i))
+            f.write(record)
+            nb_puzzles += 1
+    return nb_puzzles
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) != 3:
+        print('usage: python puzzle_dataset.py PUZZLES.txt PUZZLES.bin\n'
+              'converts a text dataset to the binary format')
+        sys.exit(2)
+    with PuzzleDataset(sys.argv[1]) as ds:
+        print('%d puzzles written' % write_binary(ds, sys.argv[2]))
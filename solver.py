@@ -1,15 +1,14 @@
 import urllib
 
-from selenium import webdriver
-from selenium.webdriver.common.keys import Keys
-from bs4 import BeautifulSoup
+# selenium, bs4 and tweet_handler (requests, lxml) are slow to import :
+# they are imported only by the code paths which use them
 import sudoku_handler
-import tweet_handler
 import re
 import time
 
 class Init:
     def __init__(self, website):
+        from selenium import webdriver
         self.driver = webdriver.Firefox()
         self.website = website
         self.close_timeout = 3
@@ -33,6 +32,7 @@ class Parse:
         """
         Create bsoup object from file or string
         """
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(self.html, 'html.parser')
         return soup
 
@@ -40,6 +40,7 @@ class Parse:
         """
         Create bsoup object from url
         """
+        from bs4 import BeautifulSoup
         req = urllib.request.Request(
             url,
             data=None,
@@ -57,15 +58,18 @@ def press_key(driver_, xpath,  msg):
     Send message to forma field
     :param msg: text message
     """
+    from selenium.webdriver.common.keys import Keys
     chat = driver_.find_element_by_xpath('//*[@id="{}"]'.format(xpath))
     chat.send_keys(msg)
     chat.send_keys(Keys.RETURN)
 
 
-def get_sudoku_data():
+def get_sudoku_data(html_data, verbose=True):
     """
     Get sudoku data
-    :return:
+    :param html_data: html of the sudoku page
+    :param verbose: print the sudoku while parsing it
+    :return: the sudoku, one line of 9 characters per row
     """
     parser = Parse(html_data)
     parsed_html = parser.make_file_soup()
@@ -76,9 +80,11 @@ def get_sudoku_data():
             cell_value = element.text.strip()
             if not cell_value:
                 cell_value = "."
-            print(cell_value, end="")
+            if verbose:
+                print(cell_value, end="")
             result += cell_value
-        print()
+        if verbose:
+            print()
         result += "\n"
     return result
 
@@ -98,8 +104,12 @@ def get_url():
 
 
 if __name__ == "__main__":
+    import tweet_handler
 
     twitter_account = 'sudokoin'
+    # maximum time spent solving a sudoku, in seconds
+    solve_time_budget = 2
+    time_sleep = 3600
     while True:
 
         newTweets = tweet_handler.getNewTweets(twitter_account)
@@ -118,20 +128,22 @@ if __name__ == "__main__":
             html_data = driver.get_html()
 
             sudoku_file = "unsolved.txt"
-            unsolved_sudoku_data = get_sudoku_data()
+            unsolved_sudoku_data = get_sudoku_data(html_data)
             with open(sudoku_file, 'w') as f:
                 f.write(unsolved_sudoku_data)
 
             print("-" * 10)
             S = sudoku_handler.Sudoku(sudoku_file)
-            S.process_all_sets()
-            for cell in  S.cells:
-                counter = 1
-                while not cell.is_solved():
-                    S.process_all_sets()
-                    print(S)
-                    print("Itteration {}: ".format(counter))
-                    counter += 1
+            result = S.solve(time_budget=solve_time_budget)
+            S = result.sudoku
+            print(S)
+            print("Solve status: {} ({} iterations, {:.3f} s)".format(
+                result.status, result.nb_iter, result.elapsed))
+            if result.status != sudoku_handler.SOLVED:
+                print("No-go: leaving this sudoku")
+                driver.close()
+                time.sleep(time_sleep)
+                continue
             counter = 0
             firt_row = True
             for element in  range(00,89):
@@ -168,6 +180,5 @@ if __name__ == "__main__":
                     firefox.driver.close()
         else:
             tweet_handler.getNewTweets(twitter_account, latest=True)
-        time_sleep = 3600
         print("Sleeping: {}".format(time_sleep))
         time.sleep(time_sleep)
@@ -0,0 +1,347 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+Sudoku solving service
+======================
+
+A small HTTP server keeping one warm solver, for the other services
+which need solutions without importing `sudoku_handler` themselves.
+
+ * POST /solve : solve one or several puzzles. The body is either
+     - JSON : {"puzzle": "<81 chars>"}, {"puzzles": ["<81 chars>", ...]},
+              or directly a puzzle string or a list of them
+     - plain text : one puzzle of 81 characters per line
+   ('1'-'9', '.' or '0' for unsolved cells).
+   The response is JSON : {"results": [{"status": ..., "solution": ...,
+   "elapsed": ...}, ...]} (or a single result for {"puzzle": ...})
+ * POST /board : parse the HTML of a sudokoin board page and solve it.
+   The response is a /solve result, plus the parsed "puzzle"
+ * GET /stats : throughput and latency counters, as JSON
+
+Connections are kept alive (HTTP/1.1). Each puzzle is solved by
+backtracking within a time budget ; when time is over, its status is
+"timed out" and its "solution" the state reached by the exclusion rules.
+
+With --warm, the server is also a pre-warmed daemon : the HTML parser
+used by /board is loaded at startup, so that thin clients
+(see sudoku_client.py) get their answers in a few ms.
+
+Usage : python solver_server.py [--port 8081] [--warm]
+"""
+
+from __future__ import division, print_function
+import argparse
+import collections
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sudoku_handler import Sudoku, SolverContext, SolveTimeout, \
+    SOLVED, PARTIAL, CONTRADICTION, TIMED_OUT
+from portfolio import backtrack
+
+# allowed characters in a puzzle :
+_PUZZLE_CHR = set('1234567890.')
+
+
+class SolverService(object):
+    """solves puzzles with the fastest engine available, and keeps
+    the throughput and latency counters
+
+    Each puzzle is solved by backtracking (see portfolio.backtrack),
+    within `time_budget`. When time is over, the state reached by the
+    exclusion rules is returned instead, computed by a warm SolverContext
+    (one per server thread). Solving is thread-safe.
+    """
+
+    # width of the throughput window, in seconds
+    rate_window = 10
+
+    def __init__(self, time_budget=1.):
+        """time_budget : maximum backtracking time per puzzle, in seconds"""
+        self.time_budget = time_budget
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.t_start = time.time()
+        self.nb_requests = 0
+        self.nb_puzzles = 0
+        self.nb_solved = 0
+        self.nb_errors = 0
+        self.latency_total = 0.
+        self.latency_max = 0.
+        # [second, number of puzzles solved during that second] :
+        self._recent = collections.deque(maxlen=self.rate_window + 1)
+
+    def _context(self):
+        """the SolverContext of the current thread"""
+        context = getattr(self._local, 'context', None)
+        if context is None:
+            context = self._local.context = SolverContext()
+        return context
+
+    def solve_one(self, puzzle):
+        """solve the 81 characters string `puzzle`
+        Returns the result, as a dict (see module docstring)
+        """
+        t0 = time.time()
+        result = {}
+        try:
+            try:
+                solution = backtrack(puzzle, t0 + self.time_budget)
+                if solution is None:
+                    status, solution = CONTRADICTION, puzzle
+                else:
+                    status = SOLVED
+            except SolveTimeout:
+                partial = self._context().reset(puzzle).solve(search=False)
+                status = TIMED_OUT if partial.status == PARTIAL \
+                    else partial.status
+                solution = partial.sudoku.to_string()
+        except Exception as e:
+            # never let a puzzle break the service
+            status, solution = 'error', puzzle
+            result['error'] = '%s: %s' % (type(e).__name__, e)
+        result.update(status=status, solution=solution,
+                      elapsed=time.time() - t0)
+        return result
+
+    def solve(self, puzzles):
+        """solve the list of 81 characters strings `puzzles`
+        Returns the list of results, as dicts (see module docstring)
+        """
+        results = [self.solve_one(p) for p in puzzles]
+        now = time.time()
+        second = int(now)
+        with self._lock:
+            self.nb_requests += 1
+            for result in results:
+                self.nb_puzzles += 1
+                self.nb_solved += result['status'] == SOLVED
+                self.nb_errors += result['status'] == 'error'
+                self.latency_total += result['elapsed']
+                self.latency_max = max(self.latency_max, result['elapsed'])
+            if self._recent and self._recent[-1][0] == second:
+                self._recent[-1][1] += len(results)
+            else:
+                self._recent.append([second, len(results)])
+        return results
+
+    def stats(self):
+        """throughput and latency counters, as a dict. The throughput
+        is measured over the last `rate_window` complete seconds, starting
+        at the first second with solved puzzles"""
+        with self._lock:
+            now = time.time()
+            second = int(now)
+            nb_puzzles = self.nb_puzzles
+            recent = [(s, n) for s, n in self._recent
+                      if second - self.rate_window <= s < second]
+            span = second - recent[0][0] if recent else 1
+            return {
+                'uptime': now - self.t_start,
+                'requests': self.nb_requests,
+                'puzzles': nb_puzzles,
+                'solved': self.nb_solved,
+                'errors': self.nb_errors,
+                'puzzles_per_second': sum(n for s, n in recent) / span,
+                'mean_latency':
+                    self.latency_total / nb_puzzles if nb_puzzles else 0.,
+                'max_latency': self.latency_max,
+            }
+
+
+def parse_puzzles(body, content_type):
+    """extract the puzzles of a /solve request body
+
+    Returns (puzzles, single) with
+     * puzzles : list of 81 characters strings
+     * single : True if the request was {"puzzle": ...}
+    ValueError is raised on malformed bodies
+    """
+    single = False
+    if content_type.startswith('application/json'):
+        data = json.loads(body.decode('utf-8'))
+        if isinstance(data, dict):
+            if 'puzzle' in data:
+                data = [data['puzzle']]
+                single = True
+            elif 'puzzles' in data:
+                data = data['puzzles']
+            else:
+                raise ValueError('expected a "puzzle" or "puzzles" key')
+        elif not isinstance(data, list):
+            data = [data]
+    else:
+        data = body.decode('ascii').split()
+    puzzles = []
+    for puzzle in data:
+        if not isinstance(puzzle, str):
+            raise ValueError('puzzles must be strings')
+        puzzle = puzzle.strip()
+        if len(puzzle) != 81 or not _PUZZLE_CHR.issuperset(puzzle):
+            raise ValueError('puzzles must be made of 81 characters '
+                             '("1"-"9", "." or "0"), got %r' % puzzle)
+        puzzles.append(puzzle)
+    if not puzzles:
+        raise ValueError('no puzzle in request')
+    return puzzles, single
+
+
+class RequestTooLarge(ValueError):
+    """raised when a request body exceeds the accepted size"""
+
+
+class SolverRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a SolverService (`server.service`)"""
+
+    # keep-alive connections :
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately : don't let Nagle's
+    # algorithm delay the body of keep-alive responses
+    disable_nagle_algorithm = True
+    # maximum size of a request body, in bytes (~12000 puzzles)
+    max_body_size = 1 << 20
+
+    def send_json(self, data, code=200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self.send_json(self.server.service.stats())
+        else:
+            self.send_json({'error': 'not found'}, 404)
+
+    def read_body(self):
+        """the request body, sent with Content-Length or chunked
+        ValueError is raised on malformed framing,
+        RequestTooLarge if the body exceeds `max_body_size`"""
+        encoding = self.headers.get('Transfer-Encoding', '').lower()
+        if 'chunked' in encoding:
+            chunks = []
+            total = 0
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size < 0:
+                    raise ValueError('negative chunk size')
+                if size == 0:
+                    break
+                total += size
+                if total > self.max_body_size:
+                    raise RequestTooLarge('request body exceeds %d bytes' %
+                                          self.max_body_size)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            # skip the trailer
+            while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                pass
+            return b''.join(chunks)
+        length = int(self.headers.get('Content-Length', 0))
+        if length < 0:
+            raise ValueError('negative Content-Length')
+        if length > self.max_body_size:
+            raise RequestTooLarge('request body exceeds %d bytes' %
+                                  self.max_body_size)
+        return self.rfile.read(length)
+
+    def do_POST(self):
+        try:
+            body = self.read_body()
+        except RequestTooLarge as e:
+            # the body is left unread : the stream can't be reused
+            self.close_connection = True
+            self.send_json({'error': str(e)}, 413)
+            return
+        except ValueError as e:
+            # the rest of the stream can't be trusted
+            self.close_connection = True
+            self.send_json({'error': 'malformed request body: %s' % e}, 400)
+            return
+        if self.path == '/board':
+            self.solve_board(body)
+            return
+        if self.path != '/solve':
+            self.send_json({'error': 'not found'}, 404)
+            return
+        try:
+            puzzles, single = parse_puzzles(
+                body, self.headers.get('Content-Type', 'text/plain'))
+        except ValueError as e:
+            # (json decoding errors are ValueError too)
+            self.send_json({'error': str(e)}, 400)
+            return
+        except RecursionError:
+            # too deeply nested JSON
+            self.send_json({'error': 'JSON nesting too deep'}, 400)
+            return
+        results = self.server.service.solve(puzzles)
+        if single:
+            self.send_json(results[0])
+        else:
+            self.send_json({'results': results})
+
+    def solve_board(self, body):
+        """POST /board : parse and solve a sudokoin board page"""
+        # (bs4 is only loaded here, or at startup by warm_up)
+        import solver
+        try:
+            board = solver.get_sudoku_data(body.decode('utf-8'),
+                                           verbose=False)
+            puzzle = Sudoku.from_string(board).to_string()
+        except ImportError as e:
+            self.send_json({'error': 'HTML parser unavailable: %s' % e}, 501)
+            return
+        except (ValueError, IndexError) as e:
+            self.send_json({'error': 'unable to parse board: %s' % e}, 400)
+            return
+        result = dict(self.server.service.solve([puzzle])[0])
+        result['puzzle'] = puzzle
+        self.send_json(result)
+
+    def log_message(self, format, *args):
+        """no log line per request"""
+        pass
+
+
+def warm_up():
+    """load the HTML parser used by /board, slow to import,
+    so that the first requests don't pay for it"""
+    try:
+        import solver
+        solver.Parse('<html></html>').make_file_soup()
+    except ImportError as e:
+        print('Warning: unable to warm up (%s)' % e)
+
+
+def make_server(host='127.0.0.1', port=8081, **service_options):
+    """create the HTTP server (not started : call its serve_forever())
+    service_options : options of the SolverService
+    """
+    server = ThreadingHTTPServer((host, port), SolverRequestHandler)
+    server.daemon_threads = True
+    server.service = SolverService(**service_options)
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sudoku solving service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--time-budget', type=float, default=1.,
+                        help='maximum solving time per puzzle, in seconds')
+    parser.add_argument('--warm', action='store_true',
+                        help='pre-load the HTML parser')
+    args = parser.parse_args()
+    if args.warm:
+        warm_up()
+    server = make_server(args.host, args.port, time_budget=args.time_budget)
+    print('Sudoku solving service on http://%s:%d' % (args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
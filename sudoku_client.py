@@ -0,0 +1,85 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+Sudoku thin client
+==================
+
+Submits a Sudoku game file to a running solving daemon
+(python solver_server.py --warm) and prints the solution. Only the
+standard library modules needed for HTTP are imported, so a one-off solve
+starts in a few milliseconds. When no daemon answers, the game is solved
+in process instead.
+
+Usage : python sudoku_client.py [unsolved.txt] [--url http://127.0.0.1:8081]
+"""
+
+from __future__ import print_function
+import http.client
+import json
+import sys
+from urllib.parse import urlsplit
+
+DEFAULT_URL = 'http://127.0.0.1:8081'
+
+
+def read_puzzle(sudoku_file):
+    """the game file as a 81 characters string (formatting removed)"""
+    with open(sudoku_file) as f:
+        return ''.join(ch for ch in f.read() if ch in '1234567890.')
+
+
+def solve_remote(puzzle, url=DEFAULT_URL, timeout=10.):
+    """solve `puzzle` (81 characters string) on the daemon at `url`
+    Returns the result dict (status, solution, elapsed)
+    OSError is raised if the daemon can't be reached
+    """
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80,
+                                      timeout=timeout)
+    try:
+        conn.request('POST', '/solve', body=json.dumps({'puzzle': puzzle}),
+                     headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        data = json.loads(response.read().decode('utf-8'))
+    finally:
+        conn.close()
+    if response.status != 200:
+        raise ValueError(data.get('error', 'HTTP error %d' % response.status))
+    return data
+
+
+def solve_local(puzzle):
+    """solve `puzzle` in process (slower start : imports the solver)"""
+    from sudoku_handler import Sudoku
+    result = Sudoku.from_string(puzzle).solve(time_budget=10.)
+    return {'status': result.status,
+            'solution': result.sudoku.to_string(),
+            'elapsed': result.elapsed}
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    url = DEFAULT_URL
+    if '--url' in args:
+        i = args.index('--url')
+        url = args[i + 1]
+        del args[i:i + 2]
+    sudoku_file = args[0] if args else 'unsolved.txt'
+    puzzle = read_puzzle(sudoku_file)
+    try:
+        try:
+            result = solve_remote(puzzle, url)
+        except OSError:
+            # no daemon running
+            result = solve_local(puzzle)
+    except ValueError as e:
+        # invalid game, rejected by the daemon or the local solver
+        print('Error: %s' % e, file=sys.stderr)
+        sys.exit(1)
+    solution = result['solution']
+    for a0 in range(9):
+        if a0 % 3 == 0 and a0 != 0:
+            print()
+        row = solution[9 * a0:9 * a0 + 9]
+        print(row[0:3] + '  ' + row[3:6] + '  ' + row[6:9])
+    print('\n%s (%.3f s)' % (result['status'], result['elapsed']))
@@ -12,23 +12,35 @@ see README.rst for more information
 """
 
 from __future__ import division, print_function
+from collections import namedtuple
 import os.path
+import time
 
-try:
-    from termcolor import colored
-except ImportError:
-    pass
-    # print('Warning: termcolor module is needed to add some fancyness!')
 
+def colored(text, color=None, on_color=None, attrs=None):
+    '''colored function of the termcolor module, imported on first use
+    (only print_all_possibilities needs it), or dummy if not installed'''
+    global colored
+    try:
+        from termcolor import colored
+    except ImportError:
+        # print('Warning: termcolor module is needed to add some fancyness!')
+        def colored(text, color=None, on_color=None, attrs=None):
+            '''dummy colored function'''
+            return text
+    return colored(text, color, on_color, attrs)
 
-    def colored(text, color=None, on_color=None, attrs=None):
-        '''dummy colored function'''
-        return text
+
+class SolveTimeout(Exception):
+    """raised when a solving deadline is reached (see Sudoku.solve)"""
 
 
 class Cell(object):
     """represents a Sudoku cell"""
 
+    # compact storage, without per instance __dict__ :
+    __slots__ = ('pos', 'possibilities')
+
     # all available possibilities in a the cell :
     all_possibilities = set(range(1, 10))  # = {1:9}
 
@@ -126,12 +138,42 @@ class Cell(object):
             return 'Cell((%d,%d), %s)' % (self.pos + (str(sol),))
 
 
+# byte -> cell value (0 for unsolved), for ascii ('1'-'9', '.', '0')
+# as well as binary (1-9, 0) puzzle descriptions.
+# Any other byte maps to INVALID_CELL
+INVALID_CELL = 0xff
+CELL_VALUE = bytearray([INVALID_CELL] * 256)
+CELL_VALUE[0] = CELL_VALUE[ord('0')] = CELL_VALUE[ord('.')] = 0
+for _d in range(1, 10):
+    CELL_VALUE[_d] = CELL_VALUE[ord('0') + _d] = _d
+CELL_VALUE = bytes(CELL_VALUE)
+# {n} sets, to solve a cell without allocating (don't modify them!)
+_SINGLETONS = [None] + [frozenset([_d]) for _d in range(1, 10)]
+
+
+# Status of a Sudoku.solve() attempt:
+SOLVED = 'solved'
+PARTIAL = 'partial'
+CONTRADICTION = 'contradiction'
+TIMED_OUT = 'timed out'
+
+SolveResult = namedtuple('SolveResult', 'status sudoku nb_iter elapsed')
+SolveResult.__doc__ = """result of Sudoku.solve() :
+ * status : SOLVED, PARTIAL, CONTRADICTION or TIMED_OUT
+ * sudoku : the solved Sudoku, or the best state reached
+ * nb_iter : (int) number of exclusion rules iterations
+ * elapsed : (float) solving time, in seconds
+"""
+
+
 class Sudoku(object):
     """represent the Sudoku game"""
     # size of the Sudoku grid
     grid_size = (9, 9)
     # size of the subblocks :
     block_size = (3, 3)
+    # characters of a game description ('.' is an unsolved cell) :
+    meaningful_chr = '123456789.'
 
     def __init__(self, input_game=None, debug=False):
         """input_game : filename of a file to load the game from
@@ -141,13 +183,12 @@ class Sudoku(object):
         # 1) Read the input, if any
         input_str = None
         if input_game is not None:
-            meaningful_chr = '123456789.'
             self.sudoku_file = input_game
             with open(input_game) as f:
                 input_str = f.read()
             # filter out blanks and formatting characters
             input_str = [ch for ch in input_str
-                         if ch in meaningful_chr]
+                         if ch in self.meaningful_chr]
             if len(input_str) == N0 * N1:  # 81
                 if debug:
                     print('Sudoku "%s" successfully loaded' %
@@ -182,6 +223,35 @@ class Sudoku(object):
 
     # end __init__
 
+    @classmethod
+    def from_string(cls, puzzle, name=''):
+        """create a Sudoku from the 81 characters string `puzzle`
+        (one character per cell, row by row, '.' or '0' for unsolved cells).
+        Blanks and formatting characters are ignored, like in a game file.
+
+        name : [optional] label used in place of the file name in displays
+        """
+        if not isinstance(puzzle, str):
+            # bytes, bytearray or memoryview of an ascii puzzle
+            puzzle = bytes(puzzle).decode('ascii')
+        S = cls()
+        S.sudoku_file = name
+        input_str = [ch for ch in puzzle.replace('0', '.')
+                     if ch in cls.meaningful_chr]
+        if len(input_str) != len(S.cells):
+            raise ValueError('Input game "%s" is of wrong size '
+                             '(should contain %d meaninful symbols instead of %d)' %
+                             (name, len(S.cells), len(input_str)))
+        for cell, ch in zip(S.cells, input_str):
+            if ch != '.':
+                cell.keep_possibilities(set([int(ch)]))
+        return S
+
+    def to_string(self):
+        """the grid at current state as a 81 characters string,
+        row by row, with '.' for unsolved cells (see Sudoku.from_string)"""
+        return ''.join(str(c) for c in self.cells)
+
     def get_cell(self, a0, a1):
         """get the cell at row `a0` and column a1
         (for interactive use only)
@@ -358,6 +428,9 @@ class Sudoku(object):
             wrong_poss = [poss_i
                           for poss_i, group_i in solved_groups
                           if not c in group_i]
+            if not wrong_poss:
+                # `c` belongs to all the solved groups
+                continue
 
             # merge the sets of wrong possibilities:
             wrong_poss = wrong_poss[0].union(*wrong_poss[1:])
@@ -417,6 +490,140 @@ class Sudoku(object):
         # Report back:
         return (is_solved, nb_iter)
 
+    def propagate(self, deadline=None):
+        """apply the Sudoku exclusion rules until there is no more progress
+
+        deadline : [optional] time.time() value after which SolveTimeout
+                   is raised (checked before each `process_all_sets` call)
+
+        Returns the number of iterations with progress.
+        ValueError is raised if the rules leave a Cell empty
+        """
+        nb_iter = 0
+        while True:
+            if deadline is not None and time.time() > deadline:
+                raise SolveTimeout('Deadline reached after %d iterations' %
+                                   nb_iter)
+            if not self.process_all_sets():
+                return nb_iter
+            nb_iter += 1
+
+    def solve(self, time_budget=None, search=True):
+        """solve the Sudoku game within a time budget
+
+        It works by applying the exclusion rules until there is no more
+        progress and, if needed, by depth-first search (see Sudoku.search).
+        It always terminates and never lets ValueError out on
+        inconsistent games.
+
+        time_budget : [optional] maximum solving time, in seconds
+        search : if False, stop after the exclusion rules
+
+        Returns a SolveResult. Unless SOLVED, its `sudoku` is the game
+        itself, in the state reached by the exclusion rules. When SOLVED,
+        it is the Sudoku returned by `search` (the game itself for a
+        SolverContext, which searches in place).
+        """
+        t0 = time.time()
+        deadline = None if time_budget is None else t0 + time_budget
+        nb_iter = 0
+        status = PARTIAL
+        solved = self
+        saved = None
+        try:
+            nb_iter = self.propagate(deadline)
+            if not self.is_consistent():
+                status = CONTRADICTION
+            elif all(c.is_solved() for c in self.cells):
+                status = SOLVED
+            elif search:
+                # keep the propagated state, in case search fails
+                saved = self.save_state()
+                solved = self.search(deadline)
+                if solved is None:
+                    status = CONTRADICTION
+                    solved = self
+                else:
+                    status = SOLVED
+        except ValueError:
+            # a Cell was left without possibility
+            status = CONTRADICTION
+        except SolveTimeout:
+            status = TIMED_OUT
+        if status != SOLVED and saved is not None:
+            self.restore_state(saved)
+        return SolveResult(status, solved, nb_iter, time.time() - t0)
+
+    # end solve
+
+    def is_consistent(self):
+        """check that no Cell set contains two cells solved
+        with the same number (the exclusion rules don't detect it)"""
+        for n in range(9 + 9 + 9):
+            solutions = [c.solution() for c in self.get_set(n)
+                         if c.is_solved()]
+            if len(solutions) != len(set(solutions)):
+                return False
+        return True
+
+    def verify(self):
+        """check that the Sudoku is completely and correctly solved"""
+        return all(c.is_solved() for c in self.cells) and \
+               self.is_consistent()
+
+    def save_state(self):
+        """the possibilities of all the cells (see Sudoku.restore_state)"""
+        return [c.possibilities.copy() for c in self.cells]
+
+    def restore_state(self, saved):
+        """bring the cells back, in place, to the possibilities `saved`
+        by Sudoku.save_state"""
+        for c, c_saved in zip(self.cells, saved):
+            c.possibilities.clear()
+            c.possibilities |= c_saved
+
+    def copy(self):
+        """independent copy of the Sudoku at current state"""
+        S = type(self)()
+        S.sudoku_file = self.sudoku_file
+        for c, c_copy in zip(self.cells, S.cells):
+            c_copy.possibilities = c.possibilities.copy()
+        return S
+
+    def search(self, deadline=None):
+        """solve the Sudoku by depth-first search : the exclusion rules
+        are applied until there is no more progress, then each possibility
+        of the least undetermined Cell is tried on a copy of the game.
+
+        deadline : [optional] time.time() value after which SolveTimeout
+                   is raised
+
+        Returns the solved Sudoku (a copy, if search was needed)
+                or None if the game has no solution
+        """
+        try:
+            self.propagate(deadline)
+        except ValueError:
+            # a Cell was left without possibility
+            return None
+        if not self.is_consistent():
+            return None
+        unsolved = [c for c in self.cells if not c.is_solved()]
+        if not unsolved:
+            return self
+        # Branch on the Cell with the fewest possibilities:
+        cell = min(unsolved, key=lambda c: len(c.possibilities))
+        i = self.cells.index(cell)
+        for poss in sorted(cell.possibilities):
+            S = self.copy()
+            S.cells[i].keep_possibilities(set([poss]))
+            solved = S.search(deadline)
+            if solved is not None:
+                return solved
+        return None
+
+    # end search
+
     def __str__(self):
         """visual text representation of the Sudoku grid at current state
         Note : this function assumes block_size == (3,3)
@@ -506,6 +713,113 @@ class Sudoku(object):
               len([c for c in self.cells if c.is_solved()]))
 
 
+class SolverContext(Sudoku):
+    """reusable Sudoku, for high-volume batch solving
+
+    The 81 cells, their possibilities sets and the 27 Cell sets are
+    allocated once. `reset` then loads the next board in place:
+
+    >>> ctx = SolverContext()
+    >>> for puzzle in puzzles:
+    ...     ctx.reset(puzzle)
+    ...     solved = ctx.search()
+    """
+
+    def __init__(self, puzzle=None):
+        """puzzle : [optional] first board to load (see SolverContext.reset)"""
+        Sudoku.__init__(self)
+        # Cell sets, in the order of Sudoku.get_set :
+        (N0, N1) = self.grid_size
+        self._sets = [Sudoku.get_row_set(self, a0) for a0 in range(N0)] + \
+                     [Sudoku.get_col_set(self, a1) for a1 in range(N1)] + \
+                     [Sudoku.get_block_set(self, (n % 3, n // 3))
+                      for n in range(9)]
+        if puzzle is not None:
+            self.reset(puzzle)
+
+    def reset(self, puzzle, name=''):
+        """load the board `puzzle` in place of the current one
+
+        puzzle : exactly 81 cells, row by row, either as a string
+                 ('1'-'9', '.' or '0' for unsolved cells) or as bytes-like
+                 in the text or binary format of a PuzzleDataset
+                 (e.g. the memoryview it returns)
+        Returns the context itself
+        ValueError is raised (and the board left unchanged)
+        on invalid input
+        """
+        if isinstance(puzzle, str):
+            puzzle = puzzle.encode('ascii')
+        if len(puzzle) != len(self.cells):
+            raise ValueError('Input game "%s" is of wrong size '
+                             '(should contain %d cells instead of %d)' %
+                             (name, len(self.cells), len(puzzle)))
+        values = bytes(puzzle).translate(CELL_VALUE)
+        if INVALID_CELL in values:
+            i = values.index(INVALID_CELL)
+            raise ValueError('Input game "%s" contains invalid cell %r '
+                             'at position %d' % (name, bytes(puzzle[i:i + 1]), i))
+        self.sudoku_file = name
+        all_possibilities = Cell.all_possibilities
+        for cell, sol in zip(self.cells, values):
+            poss = cell.possibilities
+            if sol:
+                poss.clear()
+                poss.add(sol)
+            else:
+                poss |= all_possibilities
+        return self
+
+    # end reset
+
+    def search(self, deadline=None):
+        """solve the Sudoku by depth-first search (see Sudoku.search).
+        Branches are explored in place, restoring the possibilities
+        saved before each guess, instead of working on copies.
+        On SolveTimeout, the context is left in an intermediate state.
+
+        Returns the context itself, solved,
+                or None if the game has no solution
+        """
+        try:
+            self.propagate(deadline)
+        except ValueError:
+            return None
+        if not self.is_consistent():
+            return None
+        unsolved = [c for c in self.cells if not c.is_solved()]
+        if not unsolved:
+            return self
+        cell = min(unsolved, key=lambda c: len(c.possibilities))
+        saved = self.save_state()
+        for poss in sorted(saved[self.cells.index(cell)]):
+            cell.keep_possibilities(_SINGLETONS[poss])
+            if self.search(deadline) is not None:
+                return self
+            # Backtrack:
+            self.restore_state(saved)
+        return None
+
+    # end search
+
+    def get_cell(self, a0, a1):
+        """get the cell at row `a0` and column a1"""
+        return self.cells[a0 * self.grid_size[1] + a1]
+
+    def get_row_set(self, a0):
+        """get the list of cells at row a0"""
+        return self._sets[a0]
+
+    def get_col_set(self, a1):
+        """get the list of cells at column a1"""
+        return self._sets[self.grid_size[0] + a1]
+
+    def get_set(self, n):
+        """get the list of cell corresponding to set number n
+        (see Sudoku.get_set). The list is shared : don't modify it."""
+        return self._sets[n]
+
+
 if __name__ == '__main__':
     print("Sudoku solver program")
     print("-" * 21 + '\n')
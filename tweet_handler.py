@@ -1,8 +1,20 @@
-import requests
-from bs4 import BeautifulSoup
 import os.path
 import re
 
+# requests session, created on first use (see get_session)
+_session = None
+
+
+def get_session():
+    """HTTP session shared by all requests, so that its connections are
+    reused. requests is imported here, as it is slow to import"""
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+    return _session
+
+
 def getTime(obj):
     return int(obj.find('span', {'class': '_timestamp'})['data-time'])
 
@@ -40,8 +52,9 @@ def isRetweet(tweet):
 
 
 def getTweets(user):
+    from bs4 import BeautifulSoup
     data = BeautifulSoup(
-        requests.get("https://twitter.com/i/profiles/show/%s/timeline/tweets" % (user)).json()['items_html'], 'lxml')
+        get_session().get("https://twitter.com/i/profiles/show/%s/timeline/tweets" % (user)).json()['items_html'], 'lxml')
 
     allTweets = data.find_all('li', {'class': 'js-stream-item stream-item stream-item '})
     pinnedTweet = data.find('li', {'class': 'js-stream-item stream-item stream-item js-pinned '})